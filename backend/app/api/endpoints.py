@@ -1,62 +1,145 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File, Depends
+from fastapi import APIRouter, HTTPException, UploadFile, File, Depends, Response
 from fastapi.responses import JSONResponse
-from typing import Optional
+from typing import Optional, List, Tuple
 import anthropic
 from app.core.config import settings
-from app.core.auth import get_current_user, get_current_user_optional
+from app.core.auth import authenticate_token, get_current_user, get_current_user_optional
 from app.models.schemas import User, TokenVerificationRequest, TokenVerificationResponse, ApiResponse
-import aiofiles
-import os
-from PIL import Image
+from app.utils.responses import HEALTH_RESPONSE, json_bytes
+from app.utils.image import (
+    IMAGE_SIGNATURE_LENGTH,
+    prepare_image_for_analysis,
+    sniff_image_media_type,
+)
+from PIL import Image, UnidentifiedImageError
 import io
+import asyncio
 import base64
-from pydantic import BaseModel
+import logging
+import re
+from pydantic import BaseModel, Field
+
+logger = logging.getLogger(__name__)
 
 class CoordinateRequest(BaseModel):
     latitude: float
     longitude: float
 
+class CoordinateBatchRequest(BaseModel):
+    points: List[Tuple[float, float]] = Field(
+        ..., max_length=1000, description="(latitude, longitude) pairs to analyze"
+    )
+
 router = APIRouter()
 
-_anthropic_client: Optional[anthropic.Anthropic] = None
+COORDINATE_RECOMMENDATIONS = [
+    "Monitor local weather conditions",
+    "Check flood zone maps",
+    "Consider elevation-based construction",
+    "Implement proper drainage systems"
+]
+
+# Constant responses only depend on settings, so they are serialized once
+ROOT_RESPONSE = json_bytes({
+    "message": "Flood Risk Assessment API is running",
+    "google_ai_configured": bool(settings.google_api_key),
+    # Key details are only exposed when debugging
+    **({"api_key_length": len(settings.google_api_key)} if settings.debug else {})
+})
+
+TEST_RESPONSE = json_bytes({
+    "message": "API connection successful",
+    "timestamp": "2024-01-01T00:00:00Z",
+    "status": "connected"
+})
+
+AVAILABLE_MODELS_RESPONSE = json_bytes({
+    "available_models": [{"name": settings.anthropic_model, "provider": "anthropic"}],
+    "total_count": 1,
+    "api_key_configured": bool(settings.anthropic_api_key)
+})
+
+RISK_FACTORS_RESPONSE = json_bytes({
+    "risk_factors": [
+        "Elevation and topography",
+        "Proximity to water bodies",
+        "Drainage patterns",
+        "Soil type and permeability",
+        "Land use and vegetation",
+        "Infrastructure density",
+        "Historical flood data",
+        "Climate and weather patterns"
+    ]
+})
+
+# Risk level markers in the model response, matched in a single case-insensitive pass
+_RISK_LEVEL_RE = re.compile(
+    r"(very high)|risk level: (high|low|medium)|\*\*(high|low|medium)(?=\*\*)",
+    re.IGNORECASE
+)
+_RISK_LEVEL_PRIORITY = ("very high", "high", "low", "medium")
+
+def parse_risk_level(analysis: str) -> str:
+    """Extract the risk level from the AI analysis text, defaulting to Medium"""
+    found = {
+        next(group for group in match.groups() if group).lower()
+        for match in _RISK_LEVEL_RE.finditer(analysis)
+    }
+    for level in _RISK_LEVEL_PRIORITY:
+        if level in found:
+            return level.title()
+    return "Medium"
+
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+async def read_upload(file: UploadFile, max_bytes: int) -> bytes:
+    """
+    Read an upload in chunks, rejecting it as soon as it exceeds max_bytes
+    """
+    if file.size is not None and file.size > max_bytes:
+        raise HTTPException(status_code=413, detail="File too large")
+    
+    buffer = bytearray()
+    while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+        buffer.extend(chunk)
+        if len(buffer) > max_bytes:
+            raise HTTPException(status_code=413, detail="File too large")
+    return bytes(buffer)
+
+_anthropic_client: Optional[anthropic.AsyncAnthropic] = None
 
-def get_anthropic_client() -> Optional[anthropic.Anthropic]:
+def get_anthropic_client() -> Optional[anthropic.AsyncAnthropic]:
     global _anthropic_client
     if _anthropic_client is None and settings.anthropic_api_key:
-        _anthropic_client = anthropic.Anthropic(api_key=settings.anthropic_api_key)
+        _anthropic_client = anthropic.AsyncAnthropic(api_key=settings.anthropic_api_key)
     return _anthropic_client
 
+async def close_anthropic_client() -> None:
+    """Close the shared Anthropic client and its connection pool"""
+    global _anthropic_client
+    if _anthropic_client is not None:
+        await _anthropic_client.close()
+        _anthropic_client = None
+
 @router.get("/")
 async def root():
     """Root endpoint"""
-    return {
-        "message": "Flood Risk Assessment API is running",
-        "google_ai_configured": bool(settings.google_api_key),
-        "api_key_length": len(settings.google_api_key) if settings.google_api_key else 0
-    }
+    return Response(content=ROOT_RESPONSE, media_type="application/json")
 
 @router.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {"status": "healthy", "service": "flood-risk-assessment-api"}
+    return Response(content=HEALTH_RESPONSE, media_type="application/json")
 
 @router.get("/test")
 async def test_connection():
     """Test endpoint for debugging"""
-    return {
-        "message": "API connection successful",
-        "timestamp": "2024-01-01T00:00:00Z",
-        "status": "connected"
-    }
+    return Response(content=TEST_RESPONSE, media_type="application/json")
 
 @router.get("/models")
 async def list_available_models():
     """List available AI models"""
-    return {
-        "available_models": [{"name": "claude-sonnet-4-20250514", "provider": "anthropic"}],
-        "total_count": 1,
-        "api_key_configured": bool(settings.anthropic_api_key)
-    }
+    return Response(content=AVAILABLE_MODELS_RESPONSE, media_type="application/json")
 
 @router.post("/verify-token")
 async def verify_token(request: TokenVerificationRequest):
@@ -64,9 +147,7 @@ async def verify_token(request: TokenVerificationRequest):
     Verify authentication token
     """
     try:
-        from app.core.auth import verify_token_with_frontend
-        
-        user = await verify_token_with_frontend(request.token)
+        user = await authenticate_token(request.token)
         
         if not user:
             return TokenVerificationResponse(
@@ -92,10 +173,48 @@ async def get_current_user_info(current_user: User = Depends(get_current_user)):
     """
     return ApiResponse(
         success=True,
-        data=current_user.dict(),
+        data=current_user,
         message="User information retrieved successfully"
     )
 
+def assess_coordinates(lat: float, lng: float) -> dict:
+    """
+    Mock flood risk assessment for a single coordinate pair
+    """
+    # Mock analysis - in a real app, this would call external APIs
+    # for elevation data, water proximity, etc.
+    
+    # Simple risk calculation based on coordinates
+    # This is a mock implementation - replace with real data sources
+    risk_level = "Medium"  # Default
+    if lat > 45:  # Northern latitudes
+        risk_level = "Low"
+    elif lat < 30:  # Southern latitudes
+        risk_level = "High"
+    
+    # Mock elevation (replace with real elevation API)
+    elevation = 100 + (lat * 10) + (lng * 5)
+    
+    # Mock distance from water (replace with real water proximity API)
+    distance_from_water = abs(lat) + abs(lng)
+    
+    # Mock AI analysis
+    ai_analysis = f"Location at coordinates ({lat}, {lng}) shows {risk_level.lower()} flood risk. "
+    ai_analysis += f"Elevation: {elevation:.1f}m, Distance from water: {distance_from_water:.1f}km."
+    
+    return {
+        "risk_level": risk_level,
+        "description": f"Flood risk assessment for coordinates ({lat}, {lng})",
+        "recommendations": COORDINATE_RECOMMENDATIONS,
+        "elevation": round(elevation, 1),
+        "distance_from_water": round(distance_from_water, 1),
+        "ai_analysis": ai_analysis
+    }
+
+def is_valid_coordinate(lat: float, lng: float) -> bool:
+    """Check that latitude and longitude are within range"""
+    return -90 <= lat <= 90 and -180 <= lng <= 180
+
 @router.post("/analyze/coordinates")
 async def analyze_flood_risk_coordinates(
     request: CoordinateRequest,
@@ -104,48 +223,34 @@ async def analyze_flood_risk_coordinates(
     """
     Analyze flood risk based on coordinates
     """
+    lat = request.latitude
+    lng = request.longitude
+    
+    # Validate coordinates
+    if not is_valid_coordinate(lat, lng):
+        raise HTTPException(status_code=400, detail="Invalid coordinates")
+    
     try:
-        lat = request.latitude
-        lng = request.longitude
-        
-        # Validate coordinates
-        if lat < -90 or lat > 90 or lng < -180 or lng > 180:
-            raise HTTPException(status_code=400, detail="Invalid coordinates")
-        
-        # Mock analysis - in a real app, this would call external APIs
-        # for elevation data, water proximity, etc.
-        
-        # Simple risk calculation based on coordinates
-        # This is a mock implementation - replace with real data sources
-        risk_level = "Medium"  # Default
-        if lat > 45:  # Northern latitudes
-            risk_level = "Low"
-        elif lat < 30:  # Southern latitudes
-            risk_level = "High"
-        
-        # Mock elevation (replace with real elevation API)
-        elevation = 100 + (lat * 10) + (lng * 5)
-        
-        # Mock distance from water (replace with real water proximity API)
-        distance_from_water = abs(lat) + abs(lng)
+        return assess_coordinates(lat, lng)
         
-        # Mock AI analysis
-        ai_analysis = f"Location at coordinates ({lat}, {lng}) shows {risk_level.lower()} flood risk. "
-        ai_analysis += f"Elevation: {elevation:.1f}m, Distance from water: {distance_from_water:.1f}km."
-        
-        return {
-            "risk_level": risk_level,
-            "description": f"Flood risk assessment for coordinates ({lat}, {lng})",
-            "recommendations": [
-                "Monitor local weather conditions",
-                "Check flood zone maps",
-                "Consider elevation-based construction",
-                "Implement proper drainage systems"
-            ],
-            "elevation": round(elevation, 1),
-            "distance_from_water": round(distance_from_water, 1),
-            "ai_analysis": ai_analysis
-        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error analyzing coordinates: {str(e)}")
+
+@router.post("/analyze/coordinates/batch")
+async def analyze_flood_risk_coordinates_batch(
+    request: CoordinateBatchRequest,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Analyze flood risk for many coordinates in a single request
+    """
+    for index, (lat, lng) in enumerate(request.points):
+        if not is_valid_coordinate(lat, lng):
+            raise HTTPException(status_code=400, detail=f"Invalid coordinates at index {index}")
+    
+    try:
+        results = [assess_coordinates(lat, lng) for lat, lng in request.points]
+        return {"results": results, "total_count": len(results)}
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error analyzing coordinates: {str(e)}")
@@ -158,10 +263,16 @@ async def analyze_flood_risk_image(
 ):
     """Analyze an image for flood risk assessment using Anthropic Claude"""
     try:
-        if not file.content_type or not file.content_type.startswith('image/'):
-            raise HTTPException(status_code=400, detail="File must be an image")
+        contents = await read_upload(file, settings.max_upload_size_bytes)
+
+        # Trust the file's magic bytes, not the client-supplied content type
+        media_type = sniff_image_media_type(contents[:IMAGE_SIGNATURE_LENGTH])
+        if not media_type:
+            raise HTTPException(
+                status_code=400,
+                detail="File must be a JPEG, PNG, GIF or WebP image"
+            )
 
-        contents = await file.read()
         client = get_anthropic_client()
 
         if not client:
@@ -178,8 +289,17 @@ async def analyze_flood_risk_image(
                 "ai_analysis": "AI analysis not available — API key not configured"
             }
 
-        media_type = file.content_type or "image/jpeg"
-        image_b64 = base64.b64encode(contents).decode("utf-8")
+        # Decoding and resizing is CPU-bound, keep it off the event loop
+        try:
+            image_bytes, media_type = await asyncio.to_thread(
+                prepare_image_for_analysis, contents, media_type
+            )
+        except Image.DecompressionBombError:
+            raise HTTPException(status_code=413, detail="Image dimensions too large")
+        except UnidentifiedImageError:
+            raise HTTPException(status_code=400, detail="File is not a valid image")
+
+        image_b64 = base64.b64encode(image_bytes).decode("utf-8")
 
         prompt = (
             "Analyze this image for flood risk assessment. "
@@ -192,8 +312,8 @@ async def analyze_flood_risk_image(
             "3. Specific recommendations"
         )
 
-        message = client.messages.create(
-            model="claude-sonnet-4-20250514",
+        message = await client.messages.create(
+            model=settings.anthropic_model,
             max_tokens=1024,
             messages=[
                 {
@@ -215,16 +335,7 @@ async def analyze_flood_risk_image(
 
         analysis = message.content[0].text
 
-        risk_level = "Medium"
-        analysis_lower = analysis.lower()
-        if "very high" in analysis_lower:
-            risk_level = "Very High"
-        elif "risk level: high" in analysis_lower or "**high**" in analysis_lower:
-            risk_level = "High"
-        elif "risk level: low" in analysis_lower or "**low**" in analysis_lower:
-            risk_level = "Low"
-        elif "risk level: medium" in analysis_lower or "**medium**" in analysis_lower:
-            risk_level = "Medium"
+        risk_level = parse_risk_level(analysis)
 
         return {
             "risk_level": risk_level,
@@ -240,28 +351,19 @@ async def analyze_flood_risk_image(
             "ai_analysis": analysis
         }
 
+    except HTTPException:
+        raise
     except anthropic.APIError as e:
-        print(f"Anthropic API error: {e}")
+        logger.error(f"Anthropic API error: {e}")
         raise HTTPException(status_code=502, detail=f"Anthropic API error: {str(e)}")
     except Exception as e:
-        print(f"Image analysis error: {e}")
+        logger.exception(f"Image analysis error: {e}")
         raise HTTPException(status_code=500, detail=f"Error analyzing image: {str(e)}")
 
 @router.get("/risk-factors")
 async def get_risk_factors():
     """Get common flood risk factors"""
-    return {
-        "risk_factors": [
-            "Elevation and topography",
-            "Proximity to water bodies",
-            "Drainage patterns",
-            "Soil type and permeability",
-            "Land use and vegetation",
-            "Infrastructure density",
-            "Historical flood data",
-            "Climate and weather patterns"
-        ]
-    }
+    return Response(content=RISK_FACTORS_RESPONSE, media_type="application/json")
 
 @router.post("/manual-assessment")
 async def create_manual_assessment(
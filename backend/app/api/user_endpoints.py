@@ -52,15 +52,8 @@ async def sync_user(request: SyncUserRequest):
                 detail="ClerkId and email are required"
             )
         
-        # Convert request to dict for database service
-        user_data = {
-            "clerkId": request.clerkId,
-            "email": request.email,
-            "firstName": request.firstName,
-            "lastName": request.lastName,
-            "imageUrl": request.imageUrl,
-            "lastSignInAt": request.lastSignInAt
-        }
+        # Request fields map one-to-one onto the database columns
+        user_data = request.model_dump()
         
         # Upsert user in database
         user = await database_service.upsert_user(user_data)
@@ -94,9 +87,6 @@ async def generate_token(request: GenerateTokenRequest):
                 detail="User not found. Please sync user first."
             )
         
-        # Clean up expired tokens
-        await database_service.cleanup_expired_tokens()
-        
         # Validate expiration time (max 7 days)
         expires_in_minutes = min(request.expiresInMinutes or 1440, 10080)
         
@@ -191,7 +181,7 @@ async def verify_token_endpoint(token: str):
         
         return ApiResponse(
             success=True,
-            data={"user": user.dict()},
+            data={"user": user},
             message="Token is valid"
         )
         
@@ -3,17 +3,61 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from app.models.schemas import User
 from app.services.database import database_service
 from app.services.clerk_service import clerk_service
-from typing import Optional
+from app.core.config import settings
+from app.utils.cache import token_cache_key
+from app.utils.single_flight import SingleFlight
+from cachetools import TTLCache
+from typing import Optional, Tuple
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
 # Security scheme
 security = HTTPBearer()
 
-async def verify_clerk_token(token: str) -> Optional[User]:
+# Verified users keyed by token hash: (user, expires_at)
+_user_cache: TTLCache[bytes, Tuple[User, float]] = TTLCache(
+    maxsize=settings.auth_cache_max_size,
+    ttl=settings.auth_cache_ttl_seconds
+)
+
+# Users resolved from Clerk JWT subjects, and the in-flight lookups for them
+_clerk_user_cache: TTLCache[str, User] = TTLCache(
+    maxsize=settings.auth_cache_max_size,
+    ttl=settings.clerk_user_cache_ttl_seconds
+)
+_clerk_user_lookups: SingleFlight[str, Optional[User]] = SingleFlight()
+
+def invalidate_user(clerk_id: str) -> None:
+    """Drop cached auth results for a user whose record was just written"""
+    _clerk_user_cache.pop(clerk_id, None)
+    for cache_key in list(_user_cache.keys()):
+        cached = _user_cache.get(cache_key)
+        if cached and cached[0].clerkId == clerk_id:
+            _user_cache.pop(cache_key, None)
+
+database_service.add_user_write_listener(invalidate_user)
+
+async def load_clerk_user(clerk_user_id: str) -> Optional[User]:
+    """
+    Load user by Clerk ID from our database, creating it from Clerk if missing
+    """
+    # Get user from our database first
+    user = await database_service.get_user_by_clerk_id(clerk_user_id)
+    
+    # If user doesn't exist in our DB, fetch from Clerk and create
+    if not user:
+        clerk_user_data = await clerk_service.get_user_from_clerk(clerk_user_id)
+        if clerk_user_data:
+            user_data = clerk_service.extract_user_data(clerk_user_data)
+            user = await database_service.upsert_user(user_data)
+    
+    return user
+
+async def verify_clerk_token(token: str) -> Optional[Tuple[User, Optional[float]]]:
     """
-    Verify Clerk JWT token and return user
+    Verify Clerk JWT token, returning its user and the token's exp claim
     """
     try:
         # Verify JWT token with Clerk
@@ -25,42 +69,74 @@ async def verify_clerk_token(token: str) -> Optional[User]:
         if not clerk_user_id:
             return None
         
-        # Get user from our database first
-        user = await database_service.get_user_by_clerk_id(clerk_user_id)
+        exp = token_payload.get('exp')
+        token_expires_at = float(exp) if isinstance(exp, (int, float)) else None
         
-        # If user doesn't exist in our DB, fetch from Clerk and create
+        user = _clerk_user_cache.get(clerk_user_id)
+        if user:
+            return user, token_expires_at
+        
+        # Concurrent first-sight requests for the same user share one lookup
+        user = await _clerk_user_lookups.do(
+            clerk_user_id, lambda: load_clerk_user(clerk_user_id)
+        )
         if not user:
-            clerk_user_data = await clerk_service.get_user_from_clerk(clerk_user_id)
-            if clerk_user_data:
-                user_data = clerk_service.extract_user_data(clerk_user_data)
-                user = await database_service.upsert_user(user_data)
+            return None
         
-        return user
+        _clerk_user_cache[clerk_user_id] = user
+        return user, token_expires_at
         
     except Exception as e:
         logger.error(f"Clerk token verification error: {e}")
         return None
 
-async def verify_app_token(token: str) -> Optional[User]:
+async def verify_app_token(token: str) -> Optional[Tuple[User, int]]:
     """
-    Verify our internal app token
+    Verify our internal app token, returning its user and expiry
     """
     try:
-        return await database_service.verify_token(token)
+        return await database_service.verify_token_with_expiry(token)
     except Exception as e:
         logger.error(f"App token verification error: {e}")
         return None
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> User:
-    """Get current authenticated user - supports both Clerk JWT and app tokens"""
-    token = credentials.credentials
+def _cache_expiry(token_expires_at: Optional[float]) -> float:
+    """
+    Compute how long a verified token may be served from cache,
+    never past the token's own expiry when it has one
+    """
+    expires_at = time.time() + settings.auth_cache_ttl_seconds
+    if token_expires_at is not None:
+        return min(expires_at, token_expires_at)
+    return expires_at
+
+async def authenticate_token(token: str) -> Optional[User]:
+    """Resolve the user for an app token or Clerk JWT, or None if neither verifies"""
+    cache_key = token_cache_key(token)
     
-    # Try app token first (our internal tokens)
-    user = await verify_app_token(token)
+    # Serve recently verified tokens from cache
+    cached = _user_cache.get(cache_key)
+    if cached:
+        user, expires_at = cached
+        if expires_at > time.time():
+            return user
+        _user_cache.pop(cache_key, None)
     
-    # If app token fails, try Clerk JWT
-    if not user:
-        user = await verify_clerk_token(token)
+    # Try app token first (our internal tokens), then Clerk JWT
+    verified = await verify_app_token(token) or await verify_clerk_token(token)
+    if not verified:
+        return None
+    
+    user, token_expires_at = verified
+    expires_at = _cache_expiry(token_expires_at)
+    if expires_at > time.time():
+        _user_cache[cache_key] = (user, expires_at)
+    
+    return user
+
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> User:
+    """Get current authenticated user - supports both Clerk JWT and app tokens"""
+    user = await authenticate_token(credentials.credentials)
     
     if not user:
         raise HTTPException(
@@ -1,53 +1,74 @@
-from pydantic_settings import BaseSettings
+from pydantic import Field
+from pydantic_settings import BaseSettings, SettingsConfigDict
+from functools import cached_property
+from pathlib import Path
 from typing import List
-import os
-from dotenv import load_dotenv
 
-load_dotenv()
+# Backend root and repository root; either may hold a .env file
+BASE_DIR = Path(__file__).resolve().parents[2]
+ROOT_DIR = BASE_DIR.parent
 
 class Settings(BaseSettings):
-    """Application settings"""
+    """Application settings, read from the environment and the backend .env file"""
+    
+    model_config = SettingsConfigDict(
+        # The repository-root .env (see env.example) holds the shared Clerk and
+        # CORS keys; a backend/.env, when present, overrides it
+        env_file=(ROOT_DIR / ".env", BASE_DIR / ".env"),
+        case_sensitive=False,
+        extra="ignore"
+    )
     
     # Server settings
     app_name: str = "Flood Risk Assessment API"
     app_version: str = "1.0.0"
-    debug: bool = os.getenv("DEBUG", "false").lower() == "true"
-    port: int = int(os.getenv("PORT", 8000))
-    host: str = os.getenv("HOST", "0.0.0.0")
+    debug: bool = False
+    port: int = 8000
+    host: str = "0.0.0.0"
     
     # CORS settings - using string to avoid Pydantic JSON parsing issues
     _allowed_origins_str: str = "http://localhost:3000,http://127.0.0.1:3000,http://localhost:3001,http://127.0.0.1:3001,https://flood-risk-assessment.onrender.com,https://flood-risk-assessment.vercel.app,https://flood-risk-assessment-inky.vercel.app,https://flood-risk-assessment-backend.onrender.com"
+    allowed_origins_env: str = Field("", validation_alias="ALLOWED_ORIGINS")
     
-    @property
+    @cached_property
     def allowed_origins(self) -> List[str]:
-        """Get allowed origins as a list"""
-        # Check if environment variable is set
-        env_origins = os.getenv("ALLOWED_ORIGINS")
-        if env_origins:
-            return [origin.strip() for origin in env_origins.split(',') if origin.strip()]
-        
-        # Use default value
-        return [origin.strip() for origin in self._allowed_origins_str.split(',') if origin.strip()]
+        """Get allowed origins as a list, parsed once on first access"""
+        # Use the environment value if set, otherwise the default
+        origins = self.allowed_origins_env or self._allowed_origins_str
+        return [origin.strip() for origin in origins.split(',') if origin.strip()]
     
     # Frontend settings
-    frontend_base_url: str = os.getenv("FRONTEND_BASE_URL", "http://localhost:3000")
+    frontend_base_url: str = "http://localhost:3000"
     
     # AI settings
-    google_api_key: str = os.getenv("GOOGLE_API_KEY", "")
-    anthropic_api_key: str = os.getenv("ANTHROPIC_API_KEY", "")
+    google_api_key: str = ""
+    anthropic_api_key: str = ""
+    anthropic_model: str = "claude-sonnet-4-20250514"
+    
+    # Upload settings
+    max_upload_size_bytes: int = 10 * 1024 * 1024
     
     # Clerk settings
-    clerk_secret_key: str = os.getenv("CLERK_SECRET_KEY", "")
-    clerk_publishable_key: str = os.getenv("NEXT_PUBLIC_CLERK_PUBLISHABLE_KEY", "")
+    clerk_secret_key: str = ""
+    clerk_publishable_key: str = Field("", validation_alias="NEXT_PUBLIC_CLERK_PUBLISHABLE_KEY")
+    clerk_jwks_url: str = "https://api.clerk.com/v1/jwks"
+    clerk_jwks_cache_seconds: int = 3600
+    clerk_audience: str = ""
     
     # Security settings
-    secret_key: str = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
-    algorithm: str = os.getenv("ALGORITHM", "HS256")
-    access_token_expire_minutes: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
+    secret_key: str = "your-secret-key-change-in-production"
+    algorithm: str = "HS256"
+    access_token_expire_minutes: int = 30
+    
+    # Auth cache settings
+    auth_cache_max_size: int = 10000
+    auth_cache_ttl_seconds: int = 60
+    clerk_user_cache_ttl_seconds: int = 30
+    db_cache_max_size: int = 10000
+    db_cache_ttl_seconds: int = 5
     
-    class Config:
-        env_file = ".env"
-        case_sensitive = False
+    # Background task settings
+    token_cleanup_interval_seconds: int = 300
 
 # Create settings instance
 settings = Settings()
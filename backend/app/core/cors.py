@@ -0,0 +1,103 @@
+"""
+CORS middleware
+Static-allowlist CORS handling as a plain ASGI middleware
+"""
+from typing import Iterable, List, Optional, Tuple
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+Headers = List[Tuple[bytes, bytes]]
+
+ALLOW_METHODS = b"DELETE, GET, HEAD, OPTIONS, PATCH, POST, PUT"
+PREFLIGHT_MAX_AGE = b"600"
+
+class AllowlistCORSMiddleware:
+    """
+    CORS for a fixed set of origins with credentials, any method and any header
+    
+    Behaves like Starlette's CORSMiddleware configured with allow_credentials=True
+    and wildcard methods/headers, but matches origins with a single set lookup on
+    the raw header bytes and appends precomputed headers to the response.
+    """
+    
+    def __init__(self, app: ASGIApp, allow_origins: Iterable[str]) -> None:
+        self.app = app
+        self.allow_origins = frozenset(origin.encode("latin-1") for origin in allow_origins)
+        self.allow_all_origins = b"*" in self.allow_origins
+        self.simple_headers: Headers = [
+            (b"access-control-allow-credentials", b"true"),
+        ]
+        self.preflight_headers: Headers = [
+            (b"access-control-allow-methods", ALLOW_METHODS),
+            (b"access-control-max-age", PREFLIGHT_MAX_AGE),
+            (b"access-control-allow-credentials", b"true"),
+            (b"vary", b"Origin"),
+        ]
+    
+    def is_allowed_origin(self, origin: bytes) -> bool:
+        return self.allow_all_origins or origin in self.allow_origins
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        origin = None
+        request_method = None
+        request_headers = None
+        for name, value in scope["headers"]:
+            if name == b"origin":
+                origin = value
+            elif name == b"access-control-request-method":
+                request_method = value
+            elif name == b"access-control-request-headers":
+                request_headers = value
+        
+        # Not a cross-origin request
+        if origin is None:
+            await self.app(scope, receive, send)
+            return
+        
+        if scope["method"] == "OPTIONS" and request_method is not None:
+            await self.preflight_response(origin, request_headers, send)
+            return
+        
+        allowed = self.is_allowed_origin(origin)
+        
+        async def send_with_cors(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                self.add_simple_headers(headers, origin if allowed else None)
+                message["headers"] = headers
+            await send(message)
+        
+        await self.app(scope, receive, send_with_cors)
+    
+    def add_simple_headers(self, headers: Headers, origin: Optional[bytes]) -> None:
+        """Add CORS headers, echoing origin only if it is allowed, and merge Vary"""
+        if origin is not None:
+            headers.append((b"access-control-allow-origin", origin))
+        headers.extend(self.simple_headers)
+        for index, (name, value) in enumerate(headers):
+            if name.lower() == b"vary":
+                headers[index] = (name, value + b", Origin")
+                return
+        headers.append((b"vary", b"Origin"))
+    
+    async def preflight_response(self, origin: bytes, request_headers: Optional[bytes], send: Send) -> None:
+        """Answer a preflight request without calling into the application"""
+        if not self.is_allowed_origin(origin):
+            body = b"Disallowed CORS origin"
+            status = 400
+            headers: Headers = [(b"vary", b"Origin")]
+        else:
+            body = b"OK"
+            status = 200
+            headers = [(b"access-control-allow-origin", origin), *self.preflight_headers]
+            # Any header is allowed, so mirror whatever the browser asked for
+            if request_headers:
+                headers.append((b"access-control-allow-headers", request_headers))
+        
+        headers.append((b"content-type", b"text/plain; charset=utf-8"))
+        headers.append((b"content-length", str(len(body)).encode("latin-1")))
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
@@ -1,8 +1,12 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional, List, TypeVar, Generic
 from datetime import datetime
 from enum import Enum
 
+class Schema(BaseModel):
+    """Base model deferring validator construction until first use to speed up imports"""
+    model_config = ConfigDict(defer_build=True)
+
 class RiskLevel(str, Enum):
     """Enum for flood risk levels"""
     LOW = "low"
@@ -18,7 +22,7 @@ class WaterProximity(str, Enum):
     FAR = "far"
     VERY_FAR = "very_far"
 
-class ManualAssessmentRequest(BaseModel):
+class ManualAssessmentRequest(Schema):
     """Request model for manual flood risk assessment"""
     location: str = Field(..., description="Location name or coordinates")
     elevation: float = Field(..., description="Elevation in meters above sea level")
@@ -27,7 +31,7 @@ class ManualAssessmentRequest(BaseModel):
     risk_level: RiskLevel = Field(..., description="Assessed risk level")
     additional_notes: Optional[str] = Field(None, description="Additional notes or observations")
 
-class ManualAssessmentResponse(BaseModel):
+class ManualAssessmentResponse(Schema):
     """Response model for manual flood risk assessment"""
     id: str = Field(..., description="Unique assessment ID")
     location: str = Field(..., description="Location name or coordinates")
@@ -35,12 +39,12 @@ class ManualAssessmentResponse(BaseModel):
     timestamp: datetime = Field(..., description="Assessment timestamp")
     created_by: Optional[str] = Field(None, description="User who created the assessment")
 
-class ImageAnalysisRequest(BaseModel):
+class ImageAnalysisRequest(Schema):
     """Request model for image analysis"""
     location: Optional[str] = Field(None, description="Location context for analysis")
     analysis_type: str = Field(default="flood_risk", description="Type of analysis to perform")
 
-class ImageAnalysisResponse(BaseModel):
+class ImageAnalysisResponse(Schema):
     """Response model for image analysis"""
     filename: str = Field(..., description="Name of the analyzed file")
     location: Optional[str] = Field(None, description="Location context provided")
@@ -49,26 +53,26 @@ class ImageAnalysisResponse(BaseModel):
     confidence_score: Optional[float] = Field(None, description="AI confidence score")
     processing_time: Optional[float] = Field(None, description="Processing time in seconds")
 
-class RiskFactorsResponse(BaseModel):
+class RiskFactorsResponse(Schema):
     """Response model for risk factors"""
     risk_factors: List[str] = Field(..., description="List of common flood risk factors")
     count: int = Field(..., description="Number of risk factors")
 
-class HealthResponse(BaseModel):
+class HealthResponse(Schema):
     """Response model for health check"""
     status: str = Field(..., description="Service status")
     service: str = Field(..., description="Service name")
     timestamp: datetime = Field(..., description="Health check timestamp")
     version: str = Field(..., description="API version")
 
-class ErrorResponse(BaseModel):
+class ErrorResponse(Schema):
     """Response model for errors"""
     detail: str = Field(..., description="Error description")
     error_code: Optional[str] = Field(None, description="Error code")
     timestamp: datetime = Field(..., description="Error timestamp")
 
 # User-related models
-class User(BaseModel):
+class User(Schema):
     """User model"""
     id: str = Field(..., description="User ID")
     clerkId: str = Field(..., description="Clerk user ID")
@@ -80,7 +84,7 @@ class User(BaseModel):
     updatedAt: str = Field(..., description="User last update timestamp")
     lastSignInAt: Optional[str] = Field(None, description="Last sign in timestamp")
 
-class UserToken(BaseModel):
+class UserToken(Schema):
     """User token model"""
     id: str = Field(..., description="Token ID")
     userId: str = Field(..., description="User ID")
@@ -89,11 +93,11 @@ class UserToken(BaseModel):
     expiresAt: str = Field(..., description="Token expiration timestamp")
     createdAt: str = Field(..., description="Token creation timestamp")
 
-class TokenVerificationRequest(BaseModel):
+class TokenVerificationRequest(Schema):
     """Request model for token verification"""
     token: str = Field(..., description="Token to verify")
 
-class TokenVerificationResponse(BaseModel):
+class TokenVerificationResponse(Schema):
     """Response model for token verification"""
     valid: bool = Field(..., description="Whether the token is valid")
     user: Optional[User] = Field(None, description="User associated with the token")
@@ -102,7 +106,7 @@ class TokenVerificationResponse(BaseModel):
 # Generic API Response models
 T = TypeVar('T')
 
-class ApiResponse(BaseModel, Generic[T]):
+class ApiResponse(Schema, Generic[T]):
     """Generic API response model"""
     success: bool = Field(..., description="Whether the request was successful")
     data: Optional[T] = Field(None, description="Response data")
@@ -2,6 +2,7 @@
 Clerk JWT verification service
 Handles Clerk authentication token verification
 """
+import asyncio
 import httpx
 import jwt
 from typing import Optional, Dict, Any
@@ -16,30 +17,59 @@ class ClerkService:
     def __init__(self):
         self.base_url = "https://api.clerk.com/v1"
         self.secret_key = settings.clerk_secret_key
+        # Long-lived client so Clerk API calls reuse pooled HTTP/2 connections
+        self._client: Optional[httpx.AsyncClient] = None
+        # Signing keys are fetched from Clerk's JWKS endpoint and cached per key id
+        self._jwks_client = jwt.PyJWKClient(
+            settings.clerk_jwks_url,
+            cache_keys=True,
+            lifespan=settings.clerk_jwks_cache_seconds,
+            headers={"Authorization": f"Bearer {self.secret_key}"}
+        )
         
+    def get_client(self) -> httpx.AsyncClient:
+        """Get the shared Clerk API client, creating it on first use"""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                http2=True,
+                timeout=5.0,
+                headers={
+                    "Authorization": f"Bearer {self.secret_key}",
+                    "Content-Type": "application/json"
+                },
+                limits=httpx.Limits(max_keepalive_connections=32, max_connections=64)
+            )
+        return self._client
+    
     async def verify_jwt_token(self, token: str) -> Optional[Dict[str, Any]]:
         """
         Verify Clerk JWT token and return user claims
         """
         try:
-            # For now, we'll implement a simple verification
-            # In production, you should use Clerk's proper JWT verification with public keys
-            
             if not token:
                 return None
-                
-            # Decode without verification for now (NOT SECURE FOR PRODUCTION)
-            # In production, fetch and use Clerk's public keys for verification
+            
             try:
-                payload = jwt.decode(token, options={"verify_signature": False})
+                # JWKS lookups use blocking urllib, so keep them off the event loop
+                signing_key = await asyncio.to_thread(
+                    self._jwks_client.get_signing_key_from_jwt, token
+                )
+                payload = jwt.decode(
+                    token,
+                    signing_key.key,
+                    algorithms=["RS256"],
+                    audience=settings.clerk_audience or None,
+                    options={"verify_aud": bool(settings.clerk_audience)}
+                )
                 
                 # Basic validation
                 if not payload.get('sub'):  # subject (user ID)
                     return None
-                    
+                
                 return payload
                 
-            except jwt.InvalidTokenError as e:
+            except jwt.PyJWTError as e:
                 logger.error(f"Invalid JWT token: {e}")
                 return None
                 
@@ -56,36 +86,31 @@ class ClerkService:
             return None
             
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.base_url}/users/{user_id}",
-                    headers={
-                        "Authorization": f"Bearer {self.secret_key}",
-                        "Content-Type": "application/json"
-                    }
-                )
+            response = await self.get_client().get(f"/users/{user_id}")
+            
+            if response.status_code == 200:
+                return response.json()
+            else:
+                logger.error(f"Failed to fetch user from Clerk: {response.status_code} - {response.text}")
+                return None
                 
-                if response.status_code == 200:
-                    return response.json()
-                else:
-                    logger.error(f"Failed to fetch user from Clerk: {response.status_code} - {response.text}")
-                    return None
-                    
         except Exception as e:
             logger.error(f"Error fetching user from Clerk: {e}")
             return None
     
+    async def close(self) -> None:
+        """Close the shared HTTP client"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+    
     def extract_user_data(self, clerk_user: Dict[str, Any]) -> Dict[str, Any]:
         """
         Extract relevant user data from Clerk user object
         """
         email_addresses = clerk_user.get('email_addresses', [])
-        primary_email = None
-        
-        for email in email_addresses:
-            if email.get('id') == clerk_user.get('primary_email_address_id'):
-                primary_email = email.get('email_address')
-                break
+        emails_by_id = {email.get('id'): email.get('email_address') for email in email_addresses}
+        primary_email = emails_by_id.get(clerk_user.get('primary_email_address_id'))
         
         if not primary_email and email_addresses:
             primary_email = email_addresses[0].get('email_address')
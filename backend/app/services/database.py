@@ -3,30 +3,145 @@ Database service for user management
 Clean, async implementation following SOLID principles
 """
 import aiosqlite
+import asyncio
+import base64
+import os
 import secrets
-from datetime import datetime, timedelta
+import time
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Optional
+from contextlib import asynccontextmanager, suppress
+from itertools import islice
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+from cachetools import TTLCache
+from app.core.config import settings
 from app.models.schemas import User, UserToken
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Token timestamps are stored as INTEGER unix epoch seconds for cheap range comparisons
+USER_TOKENS_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS user_tokens (
+        id TEXT PRIMARY KEY,
+        userId TEXT NOT NULL,
+        clerkId TEXT NOT NULL,
+        token TEXT UNIQUE NOT NULL,
+        expiresAt INTEGER NOT NULL,
+        createdAt INTEGER NOT NULL,
+        FOREIGN KEY (userId) REFERENCES users (id),
+        FOREIGN KEY (clerkId) REFERENCES users (clerkId)
+    )
+"""
+
+# Fixed UPDATE so SQLite can reuse one cached statement; NULL parameters keep the current value
+UPDATABLE_USER_FIELDS = ("email", "firstName", "lastName", "imageUrl", "lastSignInAt")
+UPDATE_USER_SQL = """
+    UPDATE users SET
+        email = COALESCE(?, email),
+        firstName = COALESCE(?, firstName),
+        lastName = COALESCE(?, lastName),
+        imageUrl = COALESCE(?, imageUrl),
+        lastSignInAt = COALESCE(?, lastSignInAt),
+        updatedAt = ?
+    WHERE clerkId = ?
+    RETURNING *
+"""
+
+# Most tokens resolved by one batched verify_token query
+TOKEN_BATCH_SIZE = 128
+
+# A verified token's user and the token's expiry in epoch seconds
+TokenOwner = Tuple[User, int]
+
+def epoch_to_iso(timestamp: int) -> str:
+    """Format epoch seconds as the naive UTC ISO string used across the API"""
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).replace(tzinfo=None).isoformat()
+
+# (monotonic time, ISO string) of the last utc_now_iso() refresh
+_now_cache: Tuple[float, str] = (float("-inf"), "")
+NOW_CACHE_SECONDS = 0.05
+
+def utc_now_iso() -> str:
+    """Current naive UTC ISO timestamp, reformatted at most every NOW_CACHE_SECONDS"""
+    global _now_cache
+    tick = time.monotonic()
+    if tick - _now_cache[0] > NOW_CACHE_SECONDS:
+        _now_cache = (tick, datetime.now(timezone.utc).replace(tzinfo=None).isoformat())
+    return _now_cache[1]
+
+def urlsafe_b64(raw: bytes) -> str:
+    """Encode bytes as unpadded URL-safe base64, like secrets.token_urlsafe"""
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+def user_token_from_row(row: aiosqlite.Row) -> UserToken:
+    """Build a UserToken from a user_tokens row, converting epoch timestamps"""
+    token_data = dict(row)
+    token_data["expiresAt"] = epoch_to_iso(token_data["expiresAt"])
+    token_data["createdAt"] = epoch_to_iso(token_data["createdAt"])
+    return UserToken.model_validate(token_data)
+
 class DatabaseService:
-    """Singleton database service with proper async connection management"""
+    """Database service sharing one long-lived async connection"""
+    
+    def __init__(self, db_path: str = "app_database.db") -> None:
+        self._db_path = db_path
+        self._conn: Optional[aiosqlite.Connection] = None
+        self._write_lock = asyncio.Lock()
+        # Short-lived cache of users by Clerk ID; token lookups are cached by auth
+        self._user_cache: TTLCache[str, User] = TTLCache(
+            maxsize=settings.db_cache_max_size, ttl=settings.db_cache_ttl_seconds
+        )
+        # Token lookups waiting for the next batched query, and the task running them
+        self._pending_tokens: Dict[str, List[asyncio.Future[Optional[TokenOwner]]]] = {}
+        self._token_flusher: Optional[asyncio.Task[None]] = None
+        # Callbacks run with the Clerk ID of every user written, for caches kept elsewhere
+        self._user_write_listeners: List[Callable[[str], None]] = []
     
-    _instance: Optional['DatabaseService'] = None
-    _db_path: str = "app_database.db"
+    def add_user_write_listener(self, listener: Callable[[str], None]) -> None:
+        """Register a callback to invalidate cached copies of a user after it is written"""
+        self._user_write_listeners.append(listener)
     
-    def __new__(cls) -> 'DatabaseService':
-        if cls._instance is None:
-            cls._instance = super().__new__(cls)
-        return cls._instance
+    def _user_written(self, clerk_id: str) -> None:
+        """Drop cached copies of a user that was just created or updated"""
+        self._user_cache.pop(clerk_id, None)
+        for listener in self._user_write_listeners:
+            listener(clerk_id)
+    
+    @property
+    def _db(self) -> aiosqlite.Connection:
+        """Shared connection opened by initialize()"""
+        if self._conn is None:
+            raise RuntimeError("Database not initialized")
+        return self._conn
+    
+    @asynccontextmanager
+    async def _write_transaction(self) -> AsyncIterator[None]:
+        """
+        Hold the write lock for one write, rolling back if it fails
+        
+        The connection is shared, so a failed statement must not leave its
+        implicit transaction open for the next writer to commit.
+        """
+        async with self._write_lock:
+            try:
+                yield
+            except BaseException:
+                await self._db.rollback()
+                raise
     
     async def initialize(self) -> None:
-        """Initialize database tables"""
+        """Open the shared connection and initialize database tables"""
         try:
-            async with aiosqlite.connect(self._db_path) as db:
+            if self._conn is None:
+                self._conn = await aiosqlite.connect(self._db_path)
+                self._conn.row_factory = aiosqlite.Row
+                await self._conn.execute("PRAGMA journal_mode=WAL")
+                await self._conn.execute("PRAGMA synchronous=NORMAL")
+                await self._conn.execute("PRAGMA temp_store=MEMORY")
+            
+            db = self._db
+            async with self._write_lock:
                 # Create users table
                 await db.execute("""
                     CREATE TABLE IF NOT EXISTS users (
@@ -42,26 +157,19 @@ class DatabaseService:
                     )
                 """)
                 
-                # Create user_tokens table
-                await db.execute("""
-                    CREATE TABLE IF NOT EXISTS user_tokens (
-                        id TEXT PRIMARY KEY,
-                        userId TEXT NOT NULL,
-                        clerkId TEXT NOT NULL,
-                        token TEXT UNIQUE NOT NULL,
-                        expiresAt TEXT NOT NULL,
-                        createdAt TEXT NOT NULL,
-                        FOREIGN KEY (userId) REFERENCES users (id),
-                        FOREIGN KEY (clerkId) REFERENCES users (clerkId)
-                    )
-                """)
+                # Create user_tokens table, migrating older TEXT timestamps first
+                await self._migrate_token_timestamps(db)
+                await db.execute(USER_TOKENS_TABLE_SQL)
                 
                 # Create indexes
                 await db.execute("CREATE INDEX IF NOT EXISTS idx_users_clerk_id ON users (clerkId)")
                 await db.execute("CREATE INDEX IF NOT EXISTS idx_users_email ON users (email)")
                 await db.execute("CREATE INDEX IF NOT EXISTS idx_tokens_user_id ON user_tokens (userId)")
                 await db.execute("CREATE INDEX IF NOT EXISTS idx_tokens_clerk_id ON user_tokens (clerkId)")
-                await db.execute("CREATE INDEX IF NOT EXISTS idx_tokens_token ON user_tokens (token)")
+                # token is UNIQUE, so its implicit index already serves token lookups
+                await db.execute("DROP INDEX IF EXISTS idx_tokens_token")
+                await db.execute("DROP INDEX IF EXISTS idx_tokens_token_expires")
+                await db.execute("CREATE INDEX IF NOT EXISTS idx_tokens_expires_at ON user_tokens (expiresAt)")
                 
                 await db.commit()
                 logger.info("Database initialized successfully")
@@ -70,10 +178,46 @@ class DatabaseService:
             logger.error(f"Failed to initialize database: {e}")
             raise
 
+    async def _migrate_token_timestamps(self, db: aiosqlite.Connection) -> None:
+        """Convert user_tokens ISO-8601 TEXT timestamps to INTEGER epoch seconds"""
+        async with db.execute("PRAGMA table_info(user_tokens)") as cursor:
+            column_types = {row[1]: row[2] for row in await cursor.fetchall()}
+        
+        if column_types.get("expiresAt", "INTEGER").upper() != "TEXT":
+            return
+        
+        logger.info("Migrating user_tokens timestamps to epoch seconds")
+        # Renaming moves the old indexes along, and dropping the old table removes them
+        await db.execute("ALTER TABLE user_tokens RENAME TO user_tokens_old")
+        await db.execute(USER_TOKENS_TABLE_SQL)
+        await db.execute("""
+            INSERT INTO user_tokens (id, userId, clerkId, token, expiresAt, createdAt)
+            SELECT id, userId, clerkId, token,
+                   CAST(strftime('%s', expiresAt) AS INTEGER),
+                   CAST(strftime('%s', createdAt) AS INTEGER)
+            FROM user_tokens_old
+        """)
+        await db.execute("DROP TABLE user_tokens_old")
+
+    async def close(self) -> None:
+        """Close the shared connection"""
+        if self._token_flusher is not None:
+            self._token_flusher.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._token_flusher
+        for futures in self._pending_tokens.values():
+            for future in futures:
+                future.cancel()
+        self._pending_tokens.clear()
+        
+        if self._conn is not None:
+            await self._conn.close()
+            self._conn = None
+
     async def create_user(self, user_data: dict) -> User:
         """Create a new user"""
         user_id = f"user_{secrets.token_urlsafe(16)}"
-        now = datetime.utcnow().isoformat()
+        now = utc_now_iso()
         
         user = User(
             id=user_id,
@@ -88,7 +232,8 @@ class DatabaseService:
         )
         
         try:
-            async with aiosqlite.connect(self._db_path) as db:
+            db = self._db
+            async with self._write_transaction():
                 await db.execute("""
                     INSERT INTO users (id, clerkId, email, firstName, lastName, imageUrl, createdAt, updatedAt, lastSignInAt)
                     VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
@@ -97,6 +242,7 @@ class DatabaseService:
                     user.lastName, user.imageUrl, user.createdAt, user.updatedAt, user.lastSignInAt
                 ))
                 await db.commit()
+                self._user_written(user.clerkId)
                 logger.info(f"User created successfully: {user.email}")
                 return user
                 
@@ -106,47 +252,41 @@ class DatabaseService:
 
     async def get_user_by_clerk_id(self, clerk_id: str) -> Optional[User]:
         """Get user by Clerk ID"""
+        user = self._user_cache.get(clerk_id)
+        if user:
+            return user
+        
         try:
-            async with aiosqlite.connect(self._db_path) as db:
-                db.row_factory = aiosqlite.Row
-                async with db.execute("SELECT * FROM users WHERE clerkId = ?", (clerk_id,)) as cursor:
-                    row = await cursor.fetchone()
-                    if row:
-                        return User(**dict(row))
-                    return None
-                    
+            db = self._db
+            async with db.execute("SELECT * FROM users WHERE clerkId = ?", (clerk_id,)) as cursor:
+                row = await cursor.fetchone()
+                if row:
+                    user = User.model_validate(dict(row))
+                    self._user_cache[clerk_id] = user
+                    return user
+                return None
+                
         except Exception as e:
             logger.error(f"Failed to get user by Clerk ID: {e}")
             return None
 
     async def update_user(self, clerk_id: str, update_data: dict) -> Optional[User]:
-        """Update user data"""
-        now = datetime.utcnow().isoformat()
-        
-        # Build dynamic update query
-        fields = []
-        values = []
-        
-        for key, value in update_data.items():
-            if value is not None and key != "clerkId":  # Don't update clerkId
-                fields.append(f"{key} = ?")
-                values.append(value)
-        
-        if not fields:
+        """Update user data, leaving fields that are None unchanged"""
+        values = tuple(update_data.get(field) for field in UPDATABLE_USER_FIELDS)
+        if all(value is None for value in values):
             return await self.get_user_by_clerk_id(clerk_id)
         
-        # Add updatedAt
-        fields.append("updatedAt = ?")
-        values.append(now)
-        values.append(clerk_id)  # For WHERE clause
+        now = utc_now_iso()
         
         try:
-            async with aiosqlite.connect(self._db_path) as db:
-                query = f"UPDATE users SET {', '.join(fields)} WHERE clerkId = ?"
-                await db.execute(query, values)
+            db = self._db
+            async with self._write_transaction():
+                async with db.execute(UPDATE_USER_SQL, (*values, now, clerk_id)) as cursor:
+                    row = await cursor.fetchone()
                 await db.commit()
+                self._user_written(clerk_id)
                 logger.info(f"User updated successfully: {clerk_id}")
-                return await self.get_user_by_clerk_id(clerk_id)
+                return User.model_validate(dict(row)) if row else None
                 
         except Exception as e:
             logger.error(f"Failed to update user: {e}")
@@ -155,13 +295,14 @@ class DatabaseService:
     async def upsert_user(self, user_data: dict) -> User:
         """Atomic create-or-update user using ON CONFLICT to avoid race conditions"""
         user_id = f"user_{secrets.token_urlsafe(16)}"
-        now = datetime.utcnow().isoformat()
+        now = utc_now_iso()
         last_sign_in = user_data.get("lastSignInAt", now)
 
         try:
-            async with aiosqlite.connect(self._db_path) as db:
-                db.row_factory = aiosqlite.Row
-                await db.execute("""
+            db = self._db
+            async with self._write_transaction():
+                # RETURNING hands back the stored row, so no follow-up SELECT is needed
+                async with db.execute("""
                     INSERT INTO users (id, clerkId, email, firstName, lastName, imageUrl, createdAt, updatedAt, lastSignInAt)
                     VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
                     ON CONFLICT(clerkId) DO UPDATE SET
@@ -171,18 +312,19 @@ class DatabaseService:
                         imageUrl = excluded.imageUrl,
                         updatedAt = excluded.updatedAt,
                         lastSignInAt = excluded.lastSignInAt
+                    RETURNING *
                 """, (
                     user_id, user_data["clerkId"], user_data["email"],
                     user_data.get("firstName"), user_data.get("lastName"),
                     user_data.get("imageUrl"), now, now, last_sign_in
-                ))
+                )) as cursor:
+                    row = await cursor.fetchone()
                 await db.commit()
+                self._user_written(user_data["clerkId"])
 
-                async with db.execute("SELECT * FROM users WHERE clerkId = ?", (user_data["clerkId"],)) as cursor:
-                    row = await cursor.fetchone()
-                    if row:
-                        return User(**dict(row))
-                    raise Exception("User not found after upsert")
+                if row:
+                    return User.model_validate(dict(row))
+                raise Exception("User not found after upsert")
 
         except Exception as e:
             logger.error(f"Failed to upsert user: {e}")
@@ -190,28 +332,31 @@ class DatabaseService:
 
     async def create_user_token(self, user_id: str, clerk_id: str, expires_in_minutes: int = 1440) -> UserToken:
         """Create authentication token"""
-        token_id = f"token_{secrets.token_urlsafe(16)}"
-        token = secrets.token_urlsafe(32)
-        now = datetime.utcnow()
-        expires_at = now + timedelta(minutes=expires_in_minutes)
+        # One urandom call covers both the token id (16 bytes) and the token (32 bytes)
+        raw = os.urandom(48)
+        token_id = f"token_{urlsafe_b64(raw[:16])}"
+        token = urlsafe_b64(raw[16:])
+        now = int(time.time())
+        expires_at = now + expires_in_minutes * 60
         
         user_token = UserToken(
             id=token_id,
             userId=user_id,
             clerkId=clerk_id,
             token=token,
-            expiresAt=expires_at.isoformat(),
-            createdAt=now.isoformat()
+            expiresAt=epoch_to_iso(expires_at),
+            createdAt=epoch_to_iso(now)
         )
         
         try:
-            async with aiosqlite.connect(self._db_path) as db:
+            db = self._db
+            async with self._write_transaction():
                 await db.execute("""
                     INSERT INTO user_tokens (id, userId, clerkId, token, expiresAt, createdAt)
                     VALUES (?, ?, ?, ?, ?, ?)
                 """, (
                     user_token.id, user_token.userId, user_token.clerkId,
-                    user_token.token, user_token.expiresAt, user_token.createdAt
+                    user_token.token, expires_at, now
                 ))
                 await db.commit()
                 logger.info(f"Token created for user: {clerk_id}")
@@ -224,58 +369,119 @@ class DatabaseService:
     async def get_valid_token(self, clerk_id: str) -> Optional[UserToken]:
         """Get valid token for user"""
         try:
-            async with aiosqlite.connect(self._db_path) as db:
-                db.row_factory = aiosqlite.Row
-                now = datetime.utcnow().isoformat()
-                async with db.execute("""
-                    SELECT * FROM user_tokens 
-                    WHERE clerkId = ? AND expiresAt > ?
-                    ORDER BY createdAt DESC 
-                    LIMIT 1
-                """, (clerk_id, now)) as cursor:
-                    row = await cursor.fetchone()
-                    if row:
-                        return UserToken(**dict(row))
-                    return None
-                    
+            db = self._db
+            now = int(time.time())
+            async with db.execute("""
+                SELECT * FROM user_tokens 
+                WHERE clerkId = ? AND expiresAt > ?
+                ORDER BY createdAt DESC 
+                LIMIT 1
+            """, (clerk_id, now)) as cursor:
+                row = await cursor.fetchone()
+                if row:
+                    return user_token_from_row(row)
+                return None
+                
         except Exception as e:
             logger.error(f"Failed to get token: {e}")
             return None
 
     async def verify_token(self, token: str) -> Optional[User]:
         """Verify token and return associated user"""
+        owner = await self.verify_token_with_expiry(token)
+        return owner[0] if owner else None
+
+    async def verify_token_with_expiry(self, token: str) -> Optional[TokenOwner]:
+        """Verify token and return associated user with the token's expiry"""
         try:
-            async with aiosqlite.connect(self._db_path) as db:
-                db.row_factory = aiosqlite.Row
-                now = datetime.utcnow().isoformat()
+            # Queue the lookup; concurrent callers are answered by one batched query
+            future: asyncio.Future[Optional[TokenOwner]] = asyncio.get_running_loop().create_future()
+            self._pending_tokens.setdefault(token, []).append(future)
+            if self._token_flusher is None:
+                self._token_flusher = asyncio.create_task(self._flush_token_lookups())
+            return await future
                 
-                # Get token info
-                async with db.execute("""
-                    SELECT ut.*, u.* FROM user_tokens ut
-                    JOIN users u ON ut.userId = u.id
-                    WHERE ut.token = ? AND ut.expiresAt > ?
-                """, (token, now)) as cursor:
-                    row = await cursor.fetchone()
-                    if row:
-                        user_data = {k: row[k] for k in row.keys() if k in [
-                            'id', 'clerkId', 'email', 'firstName', 'lastName', 
-                            'imageUrl', 'createdAt', 'updatedAt', 'lastSignInAt'
-                        ]}
-                        return User(**user_data)
-                    return None
-                    
         except Exception as e:
             logger.error(f"Failed to verify token: {e}")
             return None
 
-    async def cleanup_expired_tokens(self) -> None:
-        """Remove expired tokens"""
+    async def _flush_token_lookups(self) -> None:
+        """
+        Resolve queued verify_token calls in batches of up to TOKEN_BATCH_SIZE tokens
+        
+        Lookups that arrive while a query runs are picked up by the next one, so
+        batches grow with load and a lone lookup is sent on its own straight away.
+        """
         try:
-            async with aiosqlite.connect(self._db_path) as db:
-                now = datetime.utcnow().isoformat()
-                result = await db.execute("DELETE FROM user_tokens WHERE expiresAt <= ?", (now,))
-                await db.commit()
-                logger.info(f"Cleaned up {result.rowcount} expired tokens")
+            while self._pending_tokens:
+                batch = dict(islice(self._pending_tokens.items(), TOKEN_BATCH_SIZE))
+                for token in batch:
+                    del self._pending_tokens[token]
+                
+                try:
+                    owners = await self._lookup_tokens(list(batch))
+                except asyncio.CancelledError:
+                    for futures in batch.values():
+                        for future in futures:
+                            future.cancel()
+                    raise
+                except Exception as e:
+                    for futures in batch.values():
+                        for future in futures:
+                            if not future.done():
+                                future.set_exception(e)
+                    continue
+                
+                for token, futures in batch.items():
+                    owner = owners.get(token)
+                    for future in futures:
+                        if not future.done():
+                            future.set_result(owner)
+        finally:
+            self._token_flusher = None
+    
+    async def _lookup_tokens(self, tokens: List[str]) -> Dict[str, TokenOwner]:
+        """Fetch the users owning the given unexpired tokens, and their expiry, in one query"""
+        db = self._db
+        now = int(time.time())
+        placeholders = ", ".join("?" * len(tokens))
+        
+        # Select only user columns so token columns can't shadow them
+        async with db.execute(f"""
+            SELECT ut.token, ut.expiresAt AS tokenExpiresAt, u.id, u.clerkId, u.email, u.firstName, u.lastName,
+                   u.imageUrl, u.createdAt, u.updatedAt, u.lastSignInAt
+            FROM user_tokens ut
+            JOIN users u ON ut.userId = u.id
+            WHERE ut.token IN ({placeholders}) AND ut.expiresAt > ?
+        """, (*tokens, now)) as cursor:
+            owners = {}
+            for row in await cursor.fetchall():
+                user_data = dict(row)
+                token = user_data.pop("token")
+                expires_at = user_data.pop("tokenExpiresAt")
+                owners[token] = (User.model_validate(user_data), expires_at)
+            return owners
+    
+    async def cleanup_expired_tokens(self, batch_size: int = 1000) -> None:
+        """Remove expired tokens in small batches so the write lock is only held briefly"""
+        try:
+            db = self._db
+            now = int(time.time())
+            total = 0
+            while True:
+                async with self._write_transaction():
+                    result = await db.execute("""
+                        DELETE FROM user_tokens WHERE id IN (
+                            SELECT id FROM user_tokens WHERE expiresAt <= ? LIMIT ?
+                        )
+                    """, (now, batch_size))
+                    await db.commit()
+                total += result.rowcount
+                if result.rowcount < batch_size:
+                    break
+                # Let queued requests use the connection between batches
+                await asyncio.sleep(0)
+            logger.info(f"Cleaned up {total} expired tokens")
                 
         except Exception as e:
             logger.error(f"Failed to cleanup tokens: {e}")
@@ -0,0 +1,11 @@
+"""
+Cache helpers
+Shared utilities for in-process caches
+"""
+import hashlib
+
+def token_cache_key(token: str) -> bytes:
+    """
+    Build a cache key for a bearer token so raw tokens are never held in memory
+    """
+    return hashlib.blake2b(token.encode(), digest_size=16).digest()
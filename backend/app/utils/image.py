@@ -0,0 +1,56 @@
+"""
+Image helpers
+Upload inspection and preparation utilities for image analysis
+"""
+from PIL import Image
+from typing import Optional, Tuple
+import io
+
+# Number of leading bytes needed to identify every supported format
+IMAGE_SIGNATURE_LENGTH = 12
+
+# Longest side sent to the model; larger images are downscaled first
+MAX_IMAGE_DIMENSION = 1024
+
+# Refuse to decode anything bigger than this (decompression bomb guard)
+MAX_IMAGE_PIXELS = 50_000_000
+
+def sniff_image_media_type(header: bytes) -> Optional[str]:
+    """
+    Detect the image media type from its leading magic bytes
+    Returns None for anything that isn't a supported image format
+    """
+    if header.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if header.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if header.startswith((b"GIF87a", b"GIF89a")):
+        return "image/gif"
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+def prepare_image_for_analysis(contents: bytes, media_type: str) -> Tuple[bytes, str]:
+    """
+    Downscale an image so its longest side fits MAX_IMAGE_DIMENSION
+    Returns the image bytes and media type to send, untouched if already small enough
+    """
+    # Opening only parses the header, so the size check happens before any decoding
+    image = Image.open(io.BytesIO(contents))
+    width, height = image.size
+    if width * height > MAX_IMAGE_PIXELS:
+        raise Image.DecompressionBombError(
+            f"Image has {width * height} pixels, limit is {MAX_IMAGE_PIXELS}"
+        )
+    
+    if max(width, height) <= MAX_IMAGE_DIMENSION:
+        return contents, media_type
+    
+    # Let the JPEG decoder downscale during decoding instead of after
+    image.draft("RGB", (MAX_IMAGE_DIMENSION, MAX_IMAGE_DIMENSION))
+    image.thumbnail((MAX_IMAGE_DIMENSION, MAX_IMAGE_DIMENSION), Image.Resampling.LANCZOS)
+    rgb_image = image if image.mode == "RGB" else image.convert("RGB")
+    
+    output = io.BytesIO()
+    rgb_image.save(output, format="JPEG", quality=85)
+    return output.getvalue(), "image/jpeg"
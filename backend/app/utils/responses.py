@@ -0,0 +1,19 @@
+"""
+Precomputed JSON responses
+Constant response bodies shared by the app and API routers, serialized once
+"""
+import orjson
+from app.core.config import settings
+
+def json_bytes(content: dict) -> bytes:
+    """Serialize a constant response body once, at import time"""
+    return orjson.dumps(content)
+
+HEALTH_RESPONSE = json_bytes({"status": "healthy", "service": "flood-risk-assessment-api"})
+
+SERVICE_INFO_RESPONSE = json_bytes({
+    "message": f"{settings.app_name} is running",
+    "version": settings.app_version,
+    "docs": "/docs",
+    "health": "/health"
+})
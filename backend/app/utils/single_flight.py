@@ -0,0 +1,32 @@
+"""
+Single-flight call coalescing
+Concurrent callers asking for the same key share one in-flight call
+"""
+import asyncio
+from typing import Awaitable, Callable, Dict, Generic, Hashable, TypeVar
+
+K = TypeVar('K', bound=Hashable)
+T = TypeVar('T')
+
+class SingleFlight(Generic[K, T]):
+    """Run at most one call per key at a time and fan its result out to every waiter"""
+    
+    def __init__(self) -> None:
+        self._inflight: Dict[K, asyncio.Task[T]] = {}
+    
+    async def do(self, key: K, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Await fn() for key, joining the call already in flight if there is one
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        
+        # Shield so one cancelled waiter doesn't cancel the call for everyone else
+        return await asyncio.shield(task)
+    
+    def _forget(self, key: K, task: asyncio.Task[T]) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
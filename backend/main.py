@@ -1,14 +1,29 @@
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
-from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
+from fastapi.responses import ORJSONResponse
+from contextlib import asynccontextmanager, suppress
 from app.core.config import settings
+from app.core.cors import AllowlistCORSMiddleware
 from app.api import api_router
+from app.api.endpoints import close_anthropic_client
+from app.services.clerk_service import clerk_service
 from app.services.database import database_service
+from app.utils.responses import HEALTH_RESPONSE, SERVICE_INFO_RESPONSE
 import uvicorn
+import asyncio
 import logging
 
+logging.basicConfig(
+    level=logging.DEBUG if settings.debug else logging.INFO,
+    format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+)
 logger = logging.getLogger(__name__)
 
+async def cleanup_expired_tokens_periodically() -> None:
+    """Remove expired tokens on a fixed interval, off the request path"""
+    while True:
+        await asyncio.sleep(settings.token_cleanup_interval_seconds)
+        await database_service.cleanup_expired_tokens()
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan manager"""
@@ -16,11 +31,18 @@ async def lifespan(app: FastAPI):
     logger.info("Initializing database...")
     await database_service.initialize()
     logger.info("Database initialized successfully")
+    cleanup_task = asyncio.create_task(cleanup_expired_tokens_periodically())
     
     yield
     
     # Shutdown
     logger.info("Application shutting down...")
+    cleanup_task.cancel()
+    with suppress(asyncio.CancelledError):
+        await cleanup_task
+    await close_anthropic_client()
+    await clerk_service.close()
+    await database_service.close()
 
 # Create FastAPI app
 app = FastAPI(
@@ -28,17 +50,12 @@ app = FastAPI(
     description="Backend API for flood risk assessment application with user management",
     version=settings.app_version,
     debug=settings.debug,
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
 # Configure CORS
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=settings.allowed_origins,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+app.add_middleware(AllowlistCORSMiddleware, allow_origins=settings.allowed_origins)
 
 # Include API router
 app.include_router(api_router)
@@ -46,17 +63,12 @@ app.include_router(api_router)
 @app.get("/")
 async def root():
     """Root endpoint"""
-    return {
-        "message": f"{settings.app_name} is running",
-        "version": settings.app_version,
-        "docs": "/docs",
-        "health": "/health"
-    }
+    return Response(content=SERVICE_INFO_RESPONSE, media_type="application/json")
 
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {"status": "healthy", "service": "flood-risk-assessment-api"}
+    return Response(content=HEALTH_RESPONSE, media_type="application/json")
 
 if __name__ == "__main__":
     uvicorn.run(
@@ -0,0 +1,39 @@
+"""
+Tests for auth result caching
+Writing a user must not leave stale copies in the auth caches
+"""
+import time
+import pytest
+from app.core import auth
+from app.core.auth import authenticate_token
+from app.services.database import database_service
+
+@pytest.fixture
+async def database(tmp_path, monkeypatch):
+    monkeypatch.setattr(database_service, "_db_path", str(tmp_path / "test.db"))
+    await database_service.initialize()
+    yield database_service
+    await database_service.close()
+
+async def test_user_write_invalidates_cached_app_token_user(database):
+    user = await database.upsert_user({"clerkId": "clerk_app", "email": "old@example.com"})
+    token = await database.create_user_token(user.id, user.clerkId)
+    
+    assert (await authenticate_token(token.token)).email == "old@example.com"
+    
+    await database.upsert_user({"clerkId": "clerk_app", "email": "new@example.com"})
+    
+    assert (await authenticate_token(token.token)).email == "new@example.com"
+
+async def test_user_write_invalidates_cached_clerk_user(database, monkeypatch):
+    await database.upsert_user({"clerkId": "clerk_jwt", "email": "old@example.com"})
+    
+    async def verify_jwt_token(token):
+        return {"sub": "clerk_jwt", "exp": time.time() + 60} if token == "clerk-jwt" else None
+    monkeypatch.setattr(auth.clerk_service, "verify_jwt_token", verify_jwt_token)
+    
+    assert (await authenticate_token("clerk-jwt")).email == "old@example.com"
+    
+    await database.update_user("clerk_jwt", {"email": "new@example.com"})
+    
+    assert (await authenticate_token("clerk-jwt")).email == "new@example.com"
@@ -0,0 +1,31 @@
+"""
+Tests for the coordinate analysis endpoints
+Invalid coordinates are client errors on both the single and batch endpoints
+"""
+import pytest
+from fastapi.testclient import TestClient
+from app.core.auth import get_current_user
+from app.models.schemas import User
+import main
+
+@pytest.fixture
+def client():
+    user = User(id="user_test", clerkId="clerk_test", email="test@example.com", createdAt="x", updatedAt="y")
+    main.app.dependency_overrides[get_current_user] = lambda: user
+    yield TestClient(main.app)
+    main.app.dependency_overrides.clear()
+
+def test_single_coordinates_reject_invalid_with_400(client):
+    response = client.post("/api/v1/analyze/coordinates", json={"latitude": 100, "longitude": 0})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid coordinates"
+
+def test_batch_coordinates_reject_invalid_with_400(client):
+    response = client.post("/api/v1/analyze/coordinates/batch", json={"points": [[10, 20], [0, 200]]})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid coordinates at index 1"
+
+def test_single_coordinates_return_assessment(client):
+    response = client.post("/api/v1/analyze/coordinates", json={"latitude": 50, "longitude": 10})
+    assert response.status_code == 200
+    assert response.json()["risk_level"] == "Low"
@@ -0,0 +1,79 @@
+"""
+Tests for AllowlistCORSMiddleware
+Preflight and simple requests from allowed, disallowed and missing origins
+"""
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+from fastapi.testclient import TestClient
+from app.core.cors import AllowlistCORSMiddleware
+
+ALLOWED = "https://app.example.com"
+DISALLOWED = "https://evil.example.com"
+
+def make_client(allow_origins):
+    app = FastAPI()
+    app.add_middleware(AllowlistCORSMiddleware, allow_origins=allow_origins)
+    
+    @app.get("/ping")
+    async def ping():
+        return PlainTextResponse("pong", headers={"Vary": "Accept-Encoding"})
+    
+    return TestClient(app)
+
+@pytest.fixture
+def client():
+    return make_client([ALLOWED])
+
+def preflight(client, origin):
+    return client.options("/ping", headers={
+        "Origin": origin,
+        "Access-Control-Request-Method": "GET",
+        "Access-Control-Request-Headers": "authorization, x-custom",
+    })
+
+def test_allowed_preflight_echoes_origin_and_mirrors_headers(client):
+    response = preflight(client, ALLOWED)
+    assert response.status_code == 200
+    assert response.headers["access-control-allow-origin"] == ALLOWED
+    assert response.headers["access-control-allow-headers"] == "authorization, x-custom"
+    assert response.headers["access-control-allow-credentials"] == "true"
+    assert "GET" in response.headers["access-control-allow-methods"]
+    assert response.headers["vary"] == "Origin"
+
+def test_disallowed_preflight_is_rejected_with_400(client):
+    response = preflight(client, DISALLOWED)
+    assert response.status_code == 400
+    assert response.text == "Disallowed CORS origin"
+    assert "access-control-allow-origin" not in response.headers
+
+def test_allowed_simple_request_gets_origin_and_merged_vary(client):
+    response = client.get("/ping", headers={"Origin": ALLOWED})
+    assert response.status_code == 200
+    assert response.text == "pong"
+    assert response.headers["access-control-allow-origin"] == ALLOWED
+    assert response.headers["access-control-allow-credentials"] == "true"
+    assert response.headers.get_list("vary") == ["Accept-Encoding, Origin"]
+
+def test_disallowed_simple_request_gets_no_allow_origin(client):
+    response = client.get("/ping", headers={"Origin": DISALLOWED})
+    assert response.status_code == 200
+    assert "access-control-allow-origin" not in response.headers
+    assert response.headers.get_list("vary") == ["Accept-Encoding, Origin"]
+
+def test_request_without_origin_passes_through(client):
+    response = client.get("/ping")
+    assert response.status_code == 200
+    assert response.text == "pong"
+    assert "access-control-allow-origin" not in response.headers
+    assert "access-control-allow-credentials" not in response.headers
+    assert response.headers["vary"] == "Accept-Encoding"
+
+def test_wildcard_allows_any_origin():
+    client = make_client(["*"])
+    response = preflight(client, DISALLOWED)
+    assert response.status_code == 200
+    assert response.headers["access-control-allow-origin"] == DISALLOWED
+    
+    response = client.get("/ping", headers={"Origin": DISALLOWED})
+    assert response.headers["access-control-allow-origin"] == DISALLOWED
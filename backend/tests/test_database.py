@@ -0,0 +1,184 @@
+"""
+Tests for DatabaseService
+Schema migration of token timestamps and batched token verification
+"""
+import asyncio
+import sqlite3
+from datetime import datetime, timezone
+import pytest
+from app.services.database import DatabaseService
+
+# user_tokens as created before timestamps moved to INTEGER epoch seconds
+LEGACY_SCHEMA = """
+CREATE TABLE users (
+    id TEXT PRIMARY KEY,
+    clerkId TEXT UNIQUE NOT NULL,
+    email TEXT UNIQUE NOT NULL,
+    firstName TEXT,
+    lastName TEXT,
+    imageUrl TEXT,
+    createdAt TEXT NOT NULL,
+    updatedAt TEXT NOT NULL,
+    lastSignInAt TEXT
+);
+CREATE TABLE user_tokens (
+    id TEXT PRIMARY KEY,
+    userId TEXT NOT NULL,
+    clerkId TEXT NOT NULL,
+    token TEXT UNIQUE NOT NULL,
+    expiresAt TEXT NOT NULL,
+    createdAt TEXT NOT NULL,
+    FOREIGN KEY (userId) REFERENCES users (id),
+    FOREIGN KEY (clerkId) REFERENCES users (clerkId)
+);
+CREATE INDEX idx_tokens_token ON user_tokens (token);
+"""
+
+@pytest.fixture
+async def database(tmp_path):
+    database = DatabaseService(str(tmp_path / "app.db"))
+    await database.initialize()
+    yield database
+    await database.close()
+
+def epoch(iso: str) -> int:
+    return int(datetime.fromisoformat(iso).replace(tzinfo=timezone.utc).timestamp())
+
+async def test_initialize_migrates_legacy_text_timestamps(tmp_path):
+    db_path = str(tmp_path / "legacy.db")
+    with sqlite3.connect(db_path) as conn:
+        conn.executescript(LEGACY_SCHEMA)
+        conn.execute(
+            "INSERT INTO users VALUES ('user_1', 'clerk_1', 'a@example.com', NULL, NULL, NULL, "
+            "'2024-01-01T00:00:00', '2024-01-01T00:00:00', NULL)"
+        )
+        conn.executemany("INSERT INTO user_tokens VALUES (?, ?, ?, ?, ?, ?)", [
+            ("token_live", "user_1", "clerk_1", "live", "2099-01-01T00:00:00.123456", "2024-01-01T00:00:00.5"),
+            ("token_old", "user_1", "clerk_1", "old", "2020-01-01T00:00:00", "2019-01-01T00:00:00"),
+        ])
+    
+    database = DatabaseService(db_path)
+    await database.initialize()
+    try:
+        user = await database.verify_token("live")
+        assert user is not None and user.clerkId == "clerk_1"
+        assert await database.verify_token("old") is None
+        
+        token = await database.get_valid_token("clerk_1")
+        assert token is not None
+        assert token.expiresAt == "2099-01-01T00:00:00"
+        assert token.createdAt == "2024-01-01T00:00:00"
+    finally:
+        await database.close()
+    
+    with sqlite3.connect(db_path) as conn:
+        column_types = {row[1]: row[2] for row in conn.execute("PRAGMA table_info(user_tokens)")}
+        rows = conn.execute("SELECT token, expiresAt, createdAt FROM user_tokens ORDER BY token").fetchall()
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    
+    assert column_types["expiresAt"] == "INTEGER"
+    assert column_types["createdAt"] == "INTEGER"
+    assert rows == [
+        ("live", epoch("2099-01-01T00:00:00"), epoch("2024-01-01T00:00:00")),
+        ("old", epoch("2020-01-01T00:00:00"), epoch("2019-01-01T00:00:00")),
+    ]
+    assert "user_tokens_old" not in tables
+
+async def test_initialize_is_idempotent_after_migration(tmp_path):
+    db_path = str(tmp_path / "app.db")
+    for _ in range(2):
+        database = DatabaseService(db_path)
+        await database.initialize()
+        await database.close()
+    
+    with sqlite3.connect(db_path) as conn:
+        column_types = {row[1]: row[2] for row in conn.execute("PRAGMA table_info(user_tokens)")}
+    assert column_types["expiresAt"] == "INTEGER"
+
+async def create_token(database, clerk_id):
+    user = await database.upsert_user({"clerkId": clerk_id, "email": f"{clerk_id}@example.com"})
+    return (await database.create_user_token(user.id, user.clerkId)).token
+
+def block_lookups(database, monkeypatch):
+    """Hold every _lookup_tokens call until the returned release event is set"""
+    started = asyncio.Event()
+    release = asyncio.Event()
+    lookup_tokens = database._lookup_tokens
+    
+    async def blocked_lookup(tokens):
+        started.set()
+        await release.wait()
+        return await lookup_tokens(tokens)
+    monkeypatch.setattr(database, "_lookup_tokens", blocked_lookup)
+    return started, release
+
+async def test_concurrent_verify_token_calls_share_one_query(database, monkeypatch):
+    token_a = await create_token(database, "clerk_a")
+    token_b = await create_token(database, "clerk_b")
+    
+    batches = []
+    lookup_tokens = database._lookup_tokens
+    async def spy(tokens):
+        batches.append(sorted(tokens))
+        return await lookup_tokens(tokens)
+    monkeypatch.setattr(database, "_lookup_tokens", spy)
+    
+    users = await asyncio.gather(
+        database.verify_token(token_a),
+        database.verify_token(token_a),
+        database.verify_token(token_b),
+        database.verify_token("missing"),
+    )
+    
+    assert batches == [sorted([token_a, token_b, "missing"])]
+    assert [user.clerkId if user else None for user in users] == ["clerk_a", "clerk_a", "clerk_b", None]
+
+async def test_failed_batch_query_returns_none_to_every_waiter(database, monkeypatch):
+    token = await create_token(database, "clerk_a")
+    lookup_tokens = database._lookup_tokens
+    
+    async def failing_lookup(tokens):
+        raise RuntimeError("database is locked")
+    monkeypatch.setattr(database, "_lookup_tokens", failing_lookup)
+    
+    users = await asyncio.gather(*(database.verify_token(t) for t in (token, token, "other")))
+    assert users == [None, None, None]
+    
+    # The flusher recovers and later lookups query again
+    monkeypatch.setattr(database, "_lookup_tokens", lookup_tokens)
+    assert (await database.verify_token(token)).clerkId == "clerk_a"
+
+async def test_cancelled_waiter_does_not_affect_others(database, monkeypatch):
+    token_a = await create_token(database, "clerk_a")
+    token_b = await create_token(database, "clerk_b")
+    started, release = block_lookups(database, monkeypatch)
+    
+    cancelled = asyncio.create_task(database.verify_token(token_a))
+    same_token = asyncio.create_task(database.verify_token(token_a))
+    other_token = asyncio.create_task(database.verify_token(token_b))
+    await started.wait()
+    
+    cancelled.cancel()
+    release.set()
+    
+    with pytest.raises(asyncio.CancelledError):
+        await cancelled
+    assert (await same_token).clerkId == "clerk_a"
+    assert (await other_token).clerkId == "clerk_b"
+
+async def test_close_cancels_pending_lookups(database, monkeypatch):
+    token = await create_token(database, "clerk_a")
+    started, _ = block_lookups(database, monkeypatch)
+    
+    in_flight = asyncio.create_task(database.verify_token(token))
+    await started.wait()
+    queued = asyncio.create_task(database.verify_token("queued"))
+    await asyncio.sleep(0)
+    
+    await database.close()
+    
+    for task in (in_flight, queued):
+        with pytest.raises(asyncio.CancelledError):
+            await task
+    assert database._pending_tokens == {}
+    assert database._token_flusher is None
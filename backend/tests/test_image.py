@@ -0,0 +1,83 @@
+"""
+Tests for image upload handling
+Magic-byte sniffing, downscaling and the upload size cap
+"""
+import io
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+from app.api import endpoints
+from app.core.auth import get_current_user
+from app.core.config import settings
+from app.models.schemas import User
+from app.utils.image import (
+    MAX_IMAGE_DIMENSION,
+    prepare_image_for_analysis,
+    sniff_image_media_type,
+)
+import main
+
+def encode_image(size, format, mode="RGB"):
+    output = io.BytesIO()
+    Image.new(mode, size).save(output, format=format)
+    return output.getvalue()
+
+@pytest.mark.parametrize("format, media_type", [
+    ("JPEG", "image/jpeg"),
+    ("PNG", "image/png"),
+    ("GIF", "image/gif"),
+    ("WEBP", "image/webp"),
+])
+def test_sniff_recognizes_supported_formats(format, media_type):
+    assert sniff_image_media_type(encode_image((4, 4), format)[:12]) == media_type
+
+@pytest.mark.parametrize("header", [b"", b"%PDF-1.7\n", b"RIFF\x00\x00\x00\x00WAVE", b"<svg xmlns="])
+def test_sniff_rejects_other_content(header):
+    assert sniff_image_media_type(header) is None
+
+def test_prepare_passes_small_images_through():
+    contents = encode_image((64, 32), "PNG")
+    assert prepare_image_for_analysis(contents, "image/png") == (contents, "image/png")
+
+def test_prepare_downscales_large_images_to_rgb_jpeg():
+    contents = encode_image((2048, 1024), "PNG", mode="RGBA")
+    resized, media_type = prepare_image_for_analysis(contents, "image/png")
+    
+    image = Image.open(io.BytesIO(resized))
+    assert media_type == "image/jpeg"
+    assert image.format == "JPEG"
+    assert image.mode == "RGB"
+    assert max(image.size) == MAX_IMAGE_DIMENSION
+
+@pytest.fixture
+def client(monkeypatch):
+    user = User(id="user_test", clerkId="clerk_test", email="test@example.com", createdAt="x", updatedAt="y")
+    main.app.dependency_overrides[get_current_user] = lambda: user
+    monkeypatch.setattr(endpoints, "get_anthropic_client", lambda: None)
+    yield TestClient(main.app)
+    main.app.dependency_overrides.clear()
+
+def test_upload_over_the_cap_is_rejected_with_413(client, monkeypatch):
+    monkeypatch.setattr(settings, "max_upload_size_bytes", 1024)
+    contents = encode_image((4, 4), "PNG") + b"\x00" * 2048
+    
+    response = client.post("/api/v1/analyze/image", files={"file": ("big.png", contents, "image/png")})
+    
+    assert response.status_code == 413
+
+def test_upload_with_spoofed_content_type_is_rejected_with_400(client):
+    response = client.post(
+        "/api/v1/analyze/image", files={"file": ("fake.png", b"not an image at all", "image/png")}
+    )
+    
+    assert response.status_code == 400
+
+def test_upload_of_a_real_image_is_accepted(client):
+    contents = encode_image((8, 8), "JPEG")
+    
+    response = client.post(
+        "/api/v1/analyze/image", files={"file": ("photo.bin", contents, "application/octet-stream")}
+    )
+    
+    assert response.status_code == 200
+    assert response.json()["risk_level"] == "Medium"
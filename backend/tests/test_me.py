@@ -0,0 +1,27 @@
+"""
+Regression tests for user responses
+Users loaded from the database must serialize inside an untyped ApiResponse
+"""
+from fastapi.testclient import TestClient
+from app.services.database import database_service
+import main
+
+def test_user_endpoints_return_users_loaded_from_database(tmp_path, monkeypatch):
+    monkeypatch.setattr(database_service, "_db_path", str(tmp_path / "test.db"))
+    
+    with TestClient(main.app) as client:
+        user = client.portal.call(
+            database_service.upsert_user, {"clerkId": "clerk_me", "email": "me@example.com"}
+        )
+        token = client.portal.call(database_service.create_user_token, user.id, user.clerkId)
+        
+        me = client.get("/api/v1/me", headers={"Authorization": f"Bearer {token.token}"})
+        verified = client.post("/api/v1/auth/verify-token", params={"token": token.token})
+    
+    assert me.status_code == 200
+    assert me.json()["data"]["clerkId"] == "clerk_me"
+    assert me.json()["data"]["email"] == "me@example.com"
+    
+    assert verified.status_code == 200
+    assert verified.json()["success"] is True
+    assert verified.json()["data"]["user"]["clerkId"] == "clerk_me"
@@ -0,0 +1,58 @@
+"""
+Tests for SingleFlight call coalescing
+"""
+import asyncio
+import pytest
+from app.utils.single_flight import SingleFlight
+
+async def test_concurrent_callers_share_one_call():
+    flight: SingleFlight[str, int] = SingleFlight()
+    calls = 0
+    release = asyncio.Event()
+    
+    async def fetch() -> int:
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return 42
+    
+    waiters = [asyncio.create_task(flight.do("key", fetch)) for _ in range(5)]
+    await asyncio.sleep(0)
+    release.set()
+    
+    assert await asyncio.gather(*waiters) == [42] * 5
+    assert calls == 1
+
+async def test_cancelled_caller_does_not_cancel_the_others():
+    flight: SingleFlight[str, int] = SingleFlight()
+    release = asyncio.Event()
+    
+    async def fetch() -> int:
+        await release.wait()
+        return 7
+    
+    cancelled = asyncio.create_task(flight.do("key", fetch))
+    survivor = asyncio.create_task(flight.do("key", fetch))
+    await asyncio.sleep(0)
+    
+    cancelled.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await cancelled
+    
+    release.set()
+    assert await survivor == 7
+
+async def test_key_is_released_after_an_exception():
+    flight: SingleFlight[str, int] = SingleFlight()
+    
+    async def fail() -> int:
+        raise RuntimeError("boom")
+    
+    async def succeed() -> int:
+        return 1
+    
+    with pytest.raises(RuntimeError):
+        await flight.do("key", fail)
+    
+    # A fresh call runs instead of joining the failed one
+    assert await flight.do("key", succeed) == 1